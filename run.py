@@ -1,9 +1,17 @@
 import argparse
 import logging
+from concurrent.futures import ThreadPoolExecutor
 import cv2
-from src.core.object_detector import ObjectDetector, VideoCapture, VideoWriter
+from src.core.async_logging import setup_logging
+from src.core.runtime import configure_opencv_threads
+from src.core.object_detector import (
+    ObjectDetector, VideoCapture, VideoWriter, FrameReader, AsyncVideoWriter
+)
 from src.core.renderer import HUDRenderer, FPSMeter
 
+# pollKey (OpenCV >= 4.5) pumps GUI events without waitKey's 1 ms sleep.
+poll_key = getattr(cv2, "pollKey", lambda: cv2.waitKey(1))
+
 def main():
     parser = argparse.ArgumentParser(description="YOLO Object Detection Runner")
     parser.add_argument(
@@ -30,13 +38,44 @@ def main():
         "--iou", type=float, default=0.45,
         help="IoU threshold"
     )
+    parser.add_argument(
+        "--engine", action="store_true",
+        help="Export (once) and run a TensorRT engine (OpenVINO model on CPU)"
+    )
+    parser.add_argument(
+        "--precision", choices=["fp16", "int8"], default="fp16",
+        help="Numeric precision of the exported --engine model "
+             "(int8 only on CPU/OpenVINO; CUDA hosts fall back to fp16)"
+    )
+    parser.add_argument(
+        "--half", action="store_true",
+        help="Run PyTorch inference in FP16 (CUDA only)"
+    )
+    parser.add_argument(
+        "--nvenc", action="store_true",
+        help="Encode the output with NVENC through GStreamer when available"
+    )
+    parser.add_argument(
+        "--prefetch", type=int, default=8,
+        help="Frames buffered between the decode, inference and encode threads"
+    )
+    parser.add_argument(
+        "--vid-stride", type=int, default=1,
+        help="Process every Nth frame; skipped frames are grabbed but not converted or retrieved"
+    )
+    parser.add_argument(
+        "--no-display", action="store_true",
+        help="Run headless: skip the preview window and only write the output video"
+    )
     args = parser.parse_args()
 
-    logging.basicConfig(level=logging.INFO)
+    setup_logging(logging.INFO)
+    configure_opencv_threads()
     logger = logging.getLogger("runner")
 
     logger.info("Starting YOLO Object Detector...")
-    detector = ObjectDetector(args.model, args.conf, args.iou)
+    detector = ObjectDetector(args.model, args.conf, args.iou, engine=args.engine,
+                              precision=args.precision, half=args.half)
     video = VideoCapture(args.source)
 
     if not video.open():
@@ -46,30 +85,62 @@ def main():
     renderer = HUDRenderer()
     fps_meter = FPSMeter()
     
-    writer = VideoWriter(args.output, video.frame_width, video.frame_height, video.fps)
-
-    while True:
-        ret, frame = video.read()
-        if not ret:
-            logger.info("End of stream or read error.")
-            break
+    # Keep the output's duration when only every Nth frame is written.
+    stride = max(1, args.vid_stride)
+    output_fps = max(1, round(video.fps / stride))
+    
+    writer = AsyncVideoWriter(
+        VideoWriter(args.output, video.frame_width, video.frame_height, output_fps,
+                    args.nvenc),
+        args.prefetch
+    )
+    reader = FrameReader(video, args.prefetch, stride,
+                         latest=args.source.isdigit()).start()
 
-        detections = detector.detect(frame, set(args.classes))
+    # Rendering runs on a single background worker so drawing frame N overlaps
+    # with inference on frame N+1. OpenCV releases the GIL while drawing.
+    render_pool = ThreadPoolExecutor(max_workers=1)
+    pending = None
+    allowed_classes = set(args.classes)
 
-        frame = renderer.draw_detections(frame, detections)
-        
+    def render(frame, detections):
         fps_meter.update()
-        frame = renderer.draw_fps(frame, fps_meter.get_fps())
+        renderer.render(frame, detections, fps_meter.fps_str)
+        return frame
 
-        cv2.imshow("YOLO Detection", frame)
+    def show(frame) -> bool:
         writer.write(frame)
+        if args.no_display:
+            return False
+        cv2.imshow("YOLO Detection", frame)
+        return poll_key() & 0xFF == ord("q")
+
+    try:
+        while True:
+            ret, frame = reader.read()
+            if not ret:
+                logger.info("End of stream or read error.")
+                break
+
+            detections = detector.detect(frame, allowed_classes)
+
+            if pending is not None and show(pending.result()):
+                pending = None
+                break
+            pending = render_pool.submit(render, frame, detections)
+    except KeyboardInterrupt:
+        # Headless runs stop with Ctrl+C; still finalize the output file.
+        logger.info("Interrupted.")
 
-        if cv2.waitKey(1) & 0xFF == ord("q"):
-            break
+    if pending is not None:
+        show(pending.result())
+    render_pool.shutdown()
 
+    reader.stop()
     video.release()
     writer.release()
-    cv2.destroyAllWindows()
+    if not args.no_display:
+        cv2.destroyAllWindows()
     logger.info("Detection finished.")
 
 if __name__ == "__main__":
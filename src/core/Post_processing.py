@@ -83,9 +83,7 @@ class PostProcessor:
     
     @staticmethod
     def get_active_ids(detections: List[Dict]) -> List[str]:
-        ids = list(set([d["unique_id"] for d in detections]))
-        ids.sort()
-        return ids
+        return sorted({d["unique_id"] for d in detections})
     
     @staticmethod
     def process_pipeline(detections: List[Dict], 
@@ -0,0 +1,20 @@
+import atexit
+import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener
+
+
+def setup_logging(level: int = logging.INFO) -> QueueListener:
+    # Records are queued by the frame loop and written by a listener thread,
+    # so stream I/O never blocks processing.
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter(logging.BASIC_FORMAT))
+    log_queue = queue.Queue(-1)
+    listener = QueueListener(log_queue, handler)
+    queue_handler = QueueHandler(log_queue)
+    # The listener's handler applies the real format.
+    queue_handler.setFormatter(logging.Formatter("%(message)s"))
+    logging.basicConfig(level=level, handlers=[queue_handler])
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
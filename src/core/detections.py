@@ -0,0 +1,35 @@
+from dataclasses import dataclass
+from typing import Dict, List
+import numpy as np
+
+
+@dataclass
+class DetectionBatch:
+    bboxes: np.ndarray  # (N, 4) int32 x1, y1, x2, y2
+    track_ids: np.ndarray  # (N,) int32
+    confidences: np.ndarray  # (N,) float32
+    class_names: List[str]
+
+    def __len__(self) -> int:
+        return len(self.class_names)
+
+    @classmethod
+    def from_dicts(cls, detections: List[Dict]) -> "DetectionBatch":
+        return cls(
+            bboxes=np.array([d["bbox"] for d in detections],
+                            dtype=np.int32).reshape(-1, 4),
+            track_ids=np.array([d["track_id"] for d in detections], dtype=np.int32),
+            confidences=np.array([d["confidence"] for d in detections],
+                                 dtype=np.float32),
+            class_names=[d["class_name"] for d in detections],
+        )
+
+    @classmethod
+    def empty(cls) -> "DetectionBatch":
+        return cls(
+            bboxes=np.empty((0, 4), dtype=np.int32),
+            track_ids=np.empty(0, dtype=np.int32),
+            confidences=np.empty(0, dtype=np.float32),
+            class_names=[],
+        )
+
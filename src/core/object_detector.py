@@ -1,27 +1,52 @@
+import functools
 import logging
+import queue
+import sys
+import threading
 from pathlib import Path
 from typing import Dict, List, Set, Optional, Tuple
 import numpy as np
 import cv2
+import torch
 from ultralytics import YOLO
+from ultralytics.engine.results import Boxes
+from ultralytics.trackers.byte_tracker import BYTETracker
+from ultralytics.utils import IterableSimpleNamespace, yaml_load
+from ultralytics.utils.checks import check_yaml
+from .detections import DetectionBatch
 
 logger = logging.getLogger(__name__)
 
+TRACKER_CFG = "bytetrack.yaml"
+
 
 class ObjectDetector:
     
     def __init__(self, model_path: str, conf_threshold: float = 0.5, 
-                 iou_threshold: float = 0.45):
+                 iou_threshold: float = 0.45, engine: bool = False,
+                 max_batch: int = 16, precision: str = "fp16",
+                 half: bool = False):
         model_file = Path(model_path)
         if not model_file.exists():
             raise FileNotFoundError(f"Model not found: {model_path}")
         
+        if engine and model_file.suffix == ".pt":
+            model_path = self.export_engine(model_file, max_batch, precision)
+        
         logger.info(f"Loading model: {model_path}")
         self.model = YOLO(model_path)
         self.conf_threshold = conf_threshold
         self.iou_threshold = iou_threshold
+        # AutoBackend casts .pt weights to FP16 on any device, which only
+        # slows CPU inference down.
+        self.half = half and torch.cuda.is_available()
+        if half and not self.half:
+            logger.warning("FP16 inference needs CUDA; running in FP32")
+        self._tracker = None
+        self._name_to_id = {name: class_id for class_id, name in self.model.names.items()}
+        self._allowed_ids_cache: Dict[frozenset, np.ndarray] = {}
     
-    def detect(self, frame: np.ndarray, allowed_classes: Set[str]) -> List[Dict]:
+    def detect(self, frame: np.ndarray, allowed_classes: Set[str]) -> DetectionBatch:
         if frame is None or frame.size == 0:
             raise ValueError("Invalid or empty frame")
         
@@ -30,47 +55,139 @@ class ObjectDetector:
             persist=True,
             conf=self.conf_threshold,
             iou=self.iou_threshold,
+            half=self.half,
             verbose=False,
-            tracker="bytetrack.yaml" 
+            tracker=TRACKER_CFG
         )[0]
         
-        detections = []
-        
         if not hasattr(results, "boxes") or results.boxes is None or results.boxes.id is None:
-            return detections
+            return DetectionBatch.empty()
+        
+        # boxes.data columns: x1, y1, x2, y2, track_id, conf, cls. The tracker
+        # callback already rebuilt them on the host.
+        data = results.boxes.data.numpy()
+        keep = np.isin(data[:, 6].astype(np.int64),
+                       self._allowed_ids(allowed_classes))
+        return self._build_detections(data[keep])
+    
+    def detect_batch(self, frames: List[np.ndarray],
+                     allowed_classes: Set[str]) -> List[DetectionBatch]:
+        if not frames:
+            return []
         
-        track_ids = results.boxes.id.cpu().numpy().astype(int) 
+        for frame in frames:
+            if frame is None or frame.size == 0:
+                raise ValueError("Invalid or empty frame")
         
-        for i, box in enumerate(results.boxes):
-            class_id = int(box.cls)
-            class_name = self.model.names[class_id]
-            
-            if class_name not in allowed_classes:
+        # One forward pass for the whole batch. Tracking must still see the
+        # frames in order, so ByteTrack is fed sequentially afterwards
+        # (model.track on a list would keep one tracker per batch slot).
+        results = self.model.predict(
+            frames,
+            conf=self.conf_threshold,
+            iou=self.iou_threshold,
+            half=self.half,
+            verbose=False
+        )
+        
+        if self._tracker is None:
+            cfg = IterableSimpleNamespace(**yaml_load(check_yaml(TRACKER_CFG)))
+            self._tracker = BYTETracker(args=cfg, frame_rate=30)
+        
+        # Copy every frame's boxes to the host in one transfer, then split.
+        data = torch.cat([result.boxes.data for result in results]).cpu().numpy()
+        splits = np.cumsum([len(result.boxes) for result in results])[:-1]
+        
+        batch_detections = []
+        for frame, result, frame_data in zip(frames, results, np.split(data, splits)):
+            boxes = Boxes(frame_data, result.orig_shape)
+            tracks = self._tracker.update(boxes, frame) if len(boxes) else []
+            if len(tracks) == 0:
+                batch_detections.append(DetectionBatch.empty())
                 continue
             
-            x1, y1, x2, y2 = map(int, box.xyxy[0])
-            confidence = float(box.conf)
-            track_id = track_ids[i]
-            
-            class_initial = class_name[0].upper()
-            unique_id = f"ID-{track_id}-{class_initial}" 
-            
-            detections.append({
-                "bbox": (x1, y1, x2, y2),
-                "class_name": class_name,
-                "confidence": confidence,
-                "track_id": track_id,
-                "unique_id": unique_id
-            })
+            # tracks columns: x1, y1, x2, y2, track_id, conf, cls, idx
+            keep = np.isin(tracks[:, 6].astype(np.int64),
+                           self._allowed_ids(allowed_classes))
+            batch_detections.append(self._build_detections(tracks[keep]))
         
-        return detections
+        return batch_detections
     
-    def get_model_info(self) -> Dict:
+    def _allowed_ids(self, allowed_classes: Set[str]) -> np.ndarray:
+        key = frozenset(allowed_classes)
+        allowed_ids = self._allowed_ids_cache.get(key)
+        if allowed_ids is None:
+            allowed_ids = np.array(
+                [self._name_to_id[name] for name in key if name in self._name_to_id],
+                dtype=np.int64
+            )
+            self._allowed_ids_cache[key] = allowed_ids
+        return allowed_ids
+    
+    def _build_detections(self, data: np.ndarray) -> DetectionBatch:
+        if not len(data):
+            return DetectionBatch.empty()
+        
+        names = self.model.names
+        return DetectionBatch(
+            bboxes=data[:, :4].astype(np.int32),
+            track_ids=data[:, 4].astype(np.int32),
+            confidences=data[:, 5].astype(np.float32),
+            class_names=[names[class_id] for class_id in data[:, 6].astype(int).tolist()],
+        )
+    
+    @staticmethod
+    def export_engine(model_file: Path, max_batch: int, precision: str = "fp16") -> str:
+        if precision not in ("fp16", "int8"):
+            raise ValueError(f"Unsupported precision: {precision}")
+        
+        # TensorRT on NVIDIA GPUs, OpenVINO on CPU-only hosts.
+        use_trt = torch.cuda.is_available()
+        if use_trt and precision == "int8":
+            # The pinned ultralytics TensorRT exporter ignores int8 and would
+            # silently build an FP32 engine.
+            logger.warning("INT8 export is only supported for OpenVINO; "
+                           "building an FP16 TensorRT engine instead")
+            precision = "fp16"
+        # The engine's maximum batch is baked in at export time, so it is part
+        # of the cache key alongside precision.
+        tag = ("" if precision == "fp16" else f"-{precision}") + f"-b{max_batch}"
+        if use_trt:
+            target = model_file.with_name(f"{model_file.stem}{tag}.engine")
+        else:
+            target = model_file.with_name(f"{model_file.stem}{tag}_openvino_model")
+        if target.exists():
+            return str(target)
+        
+        export_args = {"half": True} if precision == "fp16" else {
+            "int8": True,
+            "data": "coco128.yaml"  # calibration images
+        }
+        logger.info(f"Exporting {precision.upper()} "
+                    f"{'TensorRT engine' if use_trt else 'OpenVINO model'}: {target}")
+        exported = YOLO(str(model_file)).export(
+            format="engine" if use_trt else "openvino",
+            imgsz=640,
+            dynamic=True,
+            batch=max_batch,
+            device=0 if use_trt else "cpu",
+            **export_args
+        )
+        return str(Path(exported).rename(target))
+    
+    @functools.cached_property
+    def _static_model_info(self) -> Dict:
+        # Fixed for the lifetime of the loaded model.
         return {
             "model_name": self.model.model_name,
             "task": self.model.task,
             "classes": self.model.names,
-            "num_classes": len(self.model.names),
+            "num_classes": len(self.model.names)
+        }
+    
+    def get_model_info(self) -> Dict:
+        return {
+            **self._static_model_info,
             "conf_threshold": self.conf_threshold,
             "iou_threshold": self.iou_threshold
         }
@@ -88,7 +205,9 @@ class VideoCapture:
     def open(self) -> bool:
         try:
             if self.source.isdigit():
-                self.cap = cv2.VideoCapture(int(self.source))
+                # V4L2 directly instead of letting OpenCV probe GStreamer first.
+                backend = cv2.CAP_V4L2 if sys.platform.startswith("linux") else cv2.CAP_ANY
+                self.cap = cv2.VideoCapture(int(self.source), backend)
                 logger.info(f"Opened camera: {self.source}")
             else:
                 video_path = Path(self.source)
@@ -99,13 +218,27 @@ class VideoCapture:
                     logger.error(f"Video file not found: {video_path}")
                     return False
                 
-                self.cap = cv2.VideoCapture(str(video_path))
+                # Let FFmpeg pick a hardware decoder (NVDEC, VAAPI, D3D11, ...)
+                # when one is available; it falls back to software otherwise.
+                self.cap = cv2.VideoCapture(
+                    str(video_path), cv2.CAP_FFMPEG,
+                    [cv2.CAP_PROP_HW_ACCELERATION, cv2.VIDEO_ACCELERATION_ANY]
+                )
                 logger.info(f"Opened video: {video_path}")
             
             if not self.cap.isOpened():
                 logger.error(f"Cannot open source: {self.source}")
                 return False
-            
+
+            if self.source.isdigit():
+                # Keep only the newest camera frame so reads are never stale.
+                if not self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1):
+                    logger.warning("Camera backend ignored CAP_PROP_BUFFERSIZE")
+                # Compressed MJPG transfers need less USB bandwidth than raw
+                # YUYV, so cameras can deliver full frame rate at high res.
+                if not self.cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*"MJPG")):
+                    logger.warning("Camera does not support MJPG, keeping default format")
+
             self.frame_width = int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH))
             self.frame_height = int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
             self.fps = int(self.cap.get(cv2.CAP_PROP_FPS)) or 30
@@ -125,39 +258,54 @@ class VideoCapture:
         ret, frame = self.cap.read()
         return ret, frame
     
+    def grab(self) -> bool:
+        if self.cap is None:
+            return False
+        return self.cap.grab()
+    
     def release(self) -> None:
         if self.cap:
             self.cap.release()
             logger.info("Video source released")
     
     def is_valid(self, frame: Optional[np.ndarray]) -> bool:
+        # Non-contiguous or non-uint8 frames would make OpenCV copy or fail.
         return (
-            frame is not None
-            and isinstance(frame, np.ndarray)
+            type(frame) is np.ndarray
             and frame.ndim == 3
             and frame.shape[2] == 3
-            and frame.size > 0
+            and frame.size != 0
+            and frame.flags.c_contiguous
+            and frame.dtype == np.uint8
         )
 
 
 class VideoWriter:    
     def __init__(self, output_path: str, frame_width: int, 
-                 frame_height: int, fps: int):
+                 frame_height: int, fps: int, nvenc: bool = False):
         self.output_path = output_path
         self.writer = None
         
         if output_path:
             Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+            if nvenc:
+                self.writer = self._open_nvenc(output_path, frame_width, frame_height, fps)
+        
+        if output_path and not self.writer:
             codecs = [
                 ('mp4v', '.mp4'),
                 ('H264', '.mp4'),
                 ('MJPG', '.avi'),
                 ('XVID', '.avi'),
             ]
+            # Honour the requested container first: .avi gets the cheap
+            # intra-frame MJPG encoder, .mp4 stays on mp4v.
+            requested_ext = Path(output_path).suffix.lower()
+            codecs.sort(key=lambda codec: codec[1] != requested_ext)
             
             for codec_name, ext in codecs:
                 try:
-                    fourcc = cv2.VideoWriter_fourcc(*codec_name) if codec_name != 'H264' else cv2.VideoWriter_fourcc(*'H264')
+                    fourcc = cv2.VideoWriter_fourcc(*codec_name)
                     output_file = output_path.replace('.mp4', ext).replace('.avi', ext)
                     
                     self.writer = cv2.VideoWriter(
@@ -179,6 +327,24 @@ class VideoWriter:
                     output_path, 0, fps, (frame_width, frame_height)
                 )
     
+    @staticmethod
+    def _open_nvenc(output_path: str, frame_width: int, frame_height: int,
+                    fps: int) -> Optional[cv2.VideoWriter]:
+        # Needs an OpenCV build with GStreamer and the nvcodec plugin.
+        muxer = "avimux" if Path(output_path).suffix.lower() == ".avi" else "mp4mux"
+        location = output_path.replace("\\", "\\\\").replace('"', '\\"')
+        pipeline = (
+            f"appsrc ! videoconvert ! nvh264enc ! h264parse ! {muxer} ! "
+            f'filesink location="{location}"'
+        )
+        writer = cv2.VideoWriter(pipeline, cv2.CAP_GSTREAMER, 0, fps,
+                                 (frame_width, frame_height))
+        if writer.isOpened():
+            logger.info(f"Output writer initialized with NVENC: {output_path}")
+            return writer
+        logger.warning("NVENC GStreamer pipeline unavailable, falling back to OpenCV codecs")
+        return None
+    
     def write(self, frame: np.ndarray) -> None:
         if self.writer:
             self.writer.write(frame)
@@ -186,4 +352,87 @@ class VideoWriter:
     def release(self) -> None:
         if self.writer:
             self.writer.release()
-            logger.info("Video writer released")
\ No newline at end of file
+            logger.info("Video writer released")
+
+
+class FrameReader:
+    def __init__(self, video: VideoCapture, prefetch: int = 8, stride: int = 1,
+                 latest: bool = False):
+        self.video = video
+        self.stride = max(1, stride)
+        # Live sources keep a single slot holding the newest frame; older
+        # frames are dropped instead of queueing up behind slow inference.
+        self.latest = latest
+        self.queue = queue.Queue(maxsize=1 if latest else max(1, prefetch))
+        self._stop = threading.Event()
+        self._done = False
+        self._thread = threading.Thread(target=self._run, daemon=True)
+    
+    def start(self) -> "FrameReader":
+        self._thread.start()
+        return self
+    
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            ret, frame = self.video.read()
+            if not ret:
+                break
+            self._put(frame)
+            # grab() skips retrieve()'s colour conversion and copy for skipped frames.
+            if not all(self.video.grab() for _ in range(self.stride - 1)):
+                break
+        self._put(None)
+    
+    def _put(self, item: Optional[np.ndarray]) -> None:
+        if self.latest:
+            # Single producer: after evicting, the put cannot fail.
+            try:
+                self.queue.get_nowait()
+            except queue.Empty:
+                pass
+            self.queue.put_nowait(item)
+            return
+        
+        while not self._stop.is_set():
+            try:
+                self.queue.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+    
+    def read(self) -> Tuple[bool, Optional[np.ndarray]]:
+        if self._done:
+            return False, None
+        
+        frame = self.queue.get()
+        if frame is None:
+            self._done = True
+            return False, None
+        return True, frame
+    
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+
+class AsyncVideoWriter:
+    def __init__(self, writer: VideoWriter, prefetch: int = 8):
+        self.writer = writer
+        self.queue = queue.Queue(maxsize=max(1, prefetch))
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+    
+    def _run(self) -> None:
+        while True:
+            frame = self.queue.get()
+            if frame is None:
+                break
+            self.writer.write(frame)
+    
+    def write(self, frame: np.ndarray) -> None:
+        self.queue.put(frame)
+    
+    def release(self) -> None:
+        self.queue.put(None)
+        self._thread.join()
+        self.writer.release()
\ No newline at end of file
@@ -1,82 +1,167 @@
+import collections
+import functools
 import time
-from typing import Dict, List, Optional, Tuple
+from typing import Callable, Deque, Dict, List, Optional, Tuple, Union
 import cv2
 import numpy as np
+from .detections import DetectionBatch
+
+
+# Confidences are shown to two decimals; index by round(conf * 100).
+_CONF_STR = tuple(f"{i / 100:.2f}" for i in range(101))
+
+
+@functools.lru_cache(maxsize=1024)
+def _label_tile(text: str, font: int, font_scale: float, thickness: int,
+                color: Tuple[int, int, int], line_type: int) -> np.ndarray:
+    # Filled label background with black text, rendered once and blitted
+    # into every frame where the same label appears.
+    (text_w, text_h), _ = cv2.getTextSize(text, font, font_scale, thickness)
+    tile = np.empty((text_h + 6, text_w + 7, 3), dtype=np.uint8)
+    tile[:] = color
+    cv2.putText(tile, text, (3, text_h + 2), font, font_scale, (0, 0, 0),
+                thickness, line_type)
+    tile.flags.writeable = False
+    return tile
 
 
 class FPSMeter:
     
-    def __init__(self):
-        self.start_time = time.time()
+    def __init__(self, window: int = 60,
+                 time_fn: Callable[[], int] = time.perf_counter_ns):
+        # time_fn returns nanoseconds; tests can pass a fake clock.
+        self._time = time_fn
+        # (timestamp_ns, cumulative frames) of the most recent updates.
+        self._samples: Deque[Tuple[int, int]] = collections.deque(maxlen=max(2, window))
         self.frame_count = 0
-        self.fps = 0.0
+        self.fps_str = "0.0"
+        self._shown_at = self._time()
+    
+    @property
+    def fps(self) -> float:
+        # Derived on demand; update() itself only records a sample.
+        if len(self._samples) < 2:
+            return 0.0
+        (oldest_time, oldest_count), (newest_time, newest_count) = (
+            self._samples[0], self._samples[-1]
+        )
+        if newest_time <= oldest_time:
+            return 0.0
+        return (newest_count - oldest_count) * 1e9 / (newest_time - oldest_time)
     
-    def update(self) -> None:
-        self.frame_count += 1
-        elapsed = time.time() - self.start_time
-        if elapsed >= 1.0:
-            self.fps = self.frame_count / elapsed
-            self.frame_count = 0
-            self.start_time = time.time()
+    def update(self, frames: int = 1) -> None:
+        # Callers processing frames in batches can report them in one call.
+        self.frame_count += frames
+        now = self._time()
+        self._samples.append((now, self.frame_count))
+        # The displayed value refreshes once a second to stay readable.
+        if now - self._shown_at >= 1_000_000_000:
+            self.fps_str = f"{self.fps:.1f}"
+            self._shown_at = now
     
     def get_fps(self) -> float:
         return round(self.fps, 2)
     
     def reset(self) -> None:
-        self.start_time = time.time()
+        self._samples.clear()
         self.frame_count = 0
-        self.fps = 0.0
+        self.fps_str = "0.0"
+        self._shown_at = self._time()
 
 
 class HUDRenderer:
     
     FONT = cv2.FONT_HERSHEY_SIMPLEX
+    AA_MIN_BOX_HEIGHT = 40
     
     def __init__(self, config: Optional[Dict] = None):
         self.config = config or {}
         self.default_color = (0, 255, 0)  # Green
+        self._resize_dst: Optional[np.ndarray] = None
+        self._resize_key = None
+        self._resize_size: Optional[Tuple[int, int]] = None
+        self._resize_interp = cv2.INTER_AREA
     
-    def draw_detections(self, frame: np.ndarray, detections: List[Dict]) -> np.ndarray:
-        for det in detections:
-            self._draw_box(frame, det)
-        return frame
+    def render(self, frame: np.ndarray,
+               detections: Union[List[Dict], DetectionBatch], fps_str: str) -> None:
+        self.draw_detections(frame, detections)
+        self.draw_fps(frame, fps_str)
     
-    def _draw_box(self, frame: np.ndarray, detection: Dict) -> None:
-        x1, y1, x2, y2 = detection["bbox"]
-        color = self.default_color 
+    def draw_detections(self, frame: np.ndarray,
+                        detections: Union[List[Dict], DetectionBatch]) -> None:
+        if not isinstance(detections, DetectionBatch):
+            detections = DetectionBatch.from_dicts(detections)
+        if not len(detections):
+            return
+        
+        color = self.default_color
         
-        label = f"{detection['confidence']:.2f} ID: {detection['track_id']}"
+        # Clip once so boxes touching the border keep all four edges visible
+        # and OpenCV never has to clip per segment.
+        frame_h, frame_w = frame.shape[:2]
+        limits = np.array([frame_w - 1, frame_h - 1, frame_w - 1, frame_h - 1],
+                          dtype=np.int32)
+        bboxes = np.clip(detections.bboxes, 0, limits)
         
-        cv2.rectangle(frame, (x1, y1), (x2, y2), color, 2)
+        # All box outlines go through one polylines call instead of one
+        # cv2.rectangle round trip per detection.
+        outlines = bboxes[:, [0, 1, 2, 1, 2, 3, 0, 3]].reshape(-1, 4, 2)
+        cv2.polylines(frame, list(outlines), True, color, 2)
         
-        self._draw_label(frame, label, x1, y1, color)
+        for (x1, y1, _, y2), conf, track_id in zip(
+                bboxes.tolist(), detections.confidences.tolist(),
+                detections.track_ids.tolist()):
+            label = f"{_CONF_STR[int(conf * 100 + 0.5)]} ID: {track_id}"
+            # Anti-aliasing is not visible on labels of small boxes.
+            line_type = cv2.LINE_8 if y2 - y1 < self.AA_MIN_BOX_HEIGHT else cv2.LINE_AA
+            self._draw_label(frame, label, x1, y1, color, line_type)
 
     def _draw_label(self, frame: np.ndarray, text: str, x: int, y: int,
-                    color: Tuple[int, int, int]) -> None:
-        font_scale = 0.5
-        thickness = 1
-        (text_w, text_h), _ = cv2.getTextSize(text, self.FONT, font_scale, thickness)
+                    color: Tuple[int, int, int],
+                    line_type: int = cv2.LINE_AA) -> None:
+        frame_h, frame_w = frame.shape[:2]
+        if x >= frame_w:
+            return
         
-        label_y = max(y - 5, text_h + 5)
+        tile = _label_tile(text, self.FONT, 0.5, 1, color, line_type)
+        tile_h, tile_w = tile.shape[:2]
         
-        cv2.rectangle(frame, (x, label_y - text_h - 5),
-                     (x + text_w + 6, label_y), color, -1)
+        top = max(y - tile_h - 4, 0)
+        if x + tile_w <= 0 or top >= frame_h:
+            return
         
-        cv2.putText(frame, text, (x + 3, label_y - 3),
-                   self.FONT, font_scale, (0, 0, 0), thickness, cv2.LINE_AA)
+        x0, x1 = max(x, 0), min(x + tile_w, frame_w)
+        y1 = min(top + tile_h, frame_h)
+        frame[top:y1, x0:x1] = tile[:y1 - top, x0 - x:x1 - x]
     
-    def draw_fps(self, frame: np.ndarray, fps: float) -> np.ndarray:
-        cv2.putText(frame, f"FPS: {fps:.1f}", (10, 30),
+    def draw_fps(self, frame: np.ndarray, fps_str: str) -> None:
+        cv2.putText(frame, "FPS: " + fps_str, (10, 30),
                    self.FONT, 0.7, (0, 255, 0), 2, cv2.LINE_AA)
-        return frame
     
     def resize_frame(self, frame: np.ndarray, max_size: Tuple[int, int]) -> np.ndarray:
-        max_width, max_height = max_size
         height, width = frame.shape[:2]
-        scale = min(max_width / width, max_height / height, 1.0)
+        key = (width, height, max_size)
+        if key != self._resize_key:
+            # Video frames keep one size per run; derive the target once.
+            max_width, max_height = max_size
+            scale = min(max_width / width, max_height / height, 1.0)
+            self._resize_key = key
+            self._resize_size = (
+                (int(width * scale), int(height * scale)) if scale < 1.0 else None
+            )
+            # INTER_AREA avoids aliasing on strong downscales; bilinear is
+            # cheaper and visually equivalent for mild ones.
+            self._resize_interp = cv2.INTER_AREA if scale < 0.5 else cv2.INTER_LINEAR
         
-        if scale < 1.0:
-            new_size = (int(width * scale), int(height * scale))
-            frame = cv2.resize(frame, new_size, interpolation=cv2.INTER_AREA)
+        new_size = self._resize_size
+        if new_size is None:
+            return frame
         
-        return frame
\ No newline at end of file
+        dst_shape = (new_size[1], new_size[0]) + frame.shape[2:]
+        if (self._resize_dst is None or self._resize_dst.shape != dst_shape
+                or self._resize_dst.dtype != frame.dtype):
+            self._resize_dst = np.empty(dst_shape, dtype=frame.dtype)
+        # The returned array is reused by the next call; copy it to keep it.
+        cv2.resize(frame, new_size, dst=self._resize_dst,
+                   interpolation=self._resize_interp)
+        return self._resize_dst
@@ -0,0 +1,10 @@
+import os
+import cv2
+
+
+def configure_opencv_threads() -> None:
+    # Leave one core for the decode thread unless the user has sized the
+    # pool through OPENCV_FOR_THREADS_NUM.
+    if "OPENCV_FOR_THREADS_NUM" not in os.environ:
+        cv2.setNumThreads(max(1, cv2.getNumberOfCPUs() - 1))
+    cv2.setUseOptimized(True)
@@ -0,0 +1,38 @@
+import argparse
+import logging
+from pathlib import Path
+from ..core.object_detector import ObjectDetector
+
+
+def main():
+    parser = argparse.ArgumentParser(description="YOLO Object Detection - Export Engine")
+    parser.add_argument(
+        "--model", type=str, default="model/yolov8n.pt",
+        help="Path to YOLO .pt model file"
+    )
+    parser.add_argument(
+        "--precision", choices=["fp16", "int8"], default="fp16",
+        help="Numeric precision of the exported model "
+             "(int8 only on CPU/OpenVINO; CUDA hosts fall back to fp16)"
+    )
+    parser.add_argument(
+        "--batch-size", type=int, default=16,
+        help="Largest batch the engine will accept"
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    logger = logging.getLogger("engine_exporter")
+
+    model_file = Path(args.model)
+    if model_file.suffix != ".pt" or not model_file.exists():
+        logger.error(f"PyTorch model not found: {args.model}")
+        return
+
+    engine_path = ObjectDetector.export_engine(
+        model_file, max(1, args.batch_size), args.precision
+    )
+    logger.info(f"Engine ready: {engine_path}")
+
+if __name__ == "__main__":
+    main()
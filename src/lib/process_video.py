@@ -1,9 +1,23 @@
 import argparse
 import logging
 from pathlib import Path
-from ..core.object_detector import ObjectDetector, VideoCapture, VideoWriter
+import cv2
+import numpy as np
+from ..core.async_logging import setup_logging
+from ..core.runtime import configure_opencv_threads
+from ..core.detections import DetectionBatch
+from ..core.object_detector import (
+    ObjectDetector, VideoCapture, VideoWriter, FrameReader, AsyncVideoWriter
+)
 from ..core.renderer import HUDRenderer, FPSMeter
 
+
+def frame_hash(frame: np.ndarray) -> int:
+    # 64-bit average hash: 8x8 grayscale thumbnail thresholded at its mean.
+    small = cv2.resize(frame, (8, 8), interpolation=cv2.INTER_AREA).mean(axis=2)
+    return int.from_bytes(np.packbits(small > small.mean()).tobytes(), "big")
+
+
 def main():
     parser = argparse.ArgumentParser(description="YOLO Object Detection - Save Marked Video")
     parser.add_argument(
@@ -30,9 +44,44 @@ def main():
         "--iou", type=float, default=0.45,
         help="IoU threshold"
     )
+    parser.add_argument(
+        "--batch-size", type=int, default=16,
+        help="Number of frames per inference batch"
+    )
+    parser.add_argument(
+        "--engine", action="store_true",
+        help="Export (once) and run a TensorRT engine (OpenVINO model on CPU)"
+    )
+    parser.add_argument(
+        "--precision", choices=["fp16", "int8"], default="fp16",
+        help="Numeric precision of the exported --engine model "
+             "(int8 only on CPU/OpenVINO; CUDA hosts fall back to fp16)"
+    )
+    parser.add_argument(
+        "--half", action="store_true",
+        help="Run PyTorch inference in FP16 (CUDA only)"
+    )
+    parser.add_argument(
+        "--nvenc", action="store_true",
+        help="Encode the output with NVENC through GStreamer when available"
+    )
+    parser.add_argument(
+        "--prefetch", type=int, default=8,
+        help="Frames buffered between the decode, inference and encode threads"
+    )
+    parser.add_argument(
+        "--vid-stride", type=int, default=1,
+        help="Process every Nth frame; skipped frames are grabbed but not converted or retrieved"
+    )
+    parser.add_argument(
+        "--skip-gate", type=int, default=0,
+        help="Reuse the previous detections when a frame's 64-bit hash differs "
+             "from the last inferred frame by fewer bits than this (0 disables)"
+    )
     args = parser.parse_args()
 
-    logging.basicConfig(level=logging.INFO)
+    setup_logging(logging.INFO)
+    configure_opencv_threads()
     logger = logging.getLogger("video_processor")
 
     input_path = Path(args.input)
@@ -42,7 +91,9 @@ def main():
     
     logger.info(f"Processing video: {args.input}")
     
-    detector = ObjectDetector(args.model, args.conf, args.iou)
+    detector = ObjectDetector(args.model, args.conf, args.iou,
+                              engine=args.engine, max_batch=max(1, args.batch_size),
+                              precision=args.precision, half=args.half)
     video = VideoCapture(args.input)
 
     if not video.open():
@@ -54,41 +105,80 @@ def main():
     output_path = Path(args.output)
     output_path.parent.mkdir(parents=True, exist_ok=True)
     
-    writer = VideoWriter(args.output, video.frame_width, video.frame_height, video.fps)
+    # Keep the output's duration when only every Nth frame is written.
+    stride = max(1, args.vid_stride)
+    output_fps = max(1, round(video.fps / stride))
+    expected_frames = -(-video.total_frames // stride)
+    
+    writer = AsyncVideoWriter(
+        VideoWriter(args.output, video.frame_width, video.frame_height, output_fps,
+                    args.nvenc),
+        args.prefetch
+    )
+    reader = FrameReader(video, args.prefetch, stride).start()
 
     logger.info(f"Output will be saved to: {args.output}")
-    logger.info(f"Processing {video.total_frames} frames at {video.fps} FPS")
+    logger.info(f"Processing {expected_frames} frames at {output_fps} FPS")
     
     frame_count = 0
     total_detections = 0
+    skipped_frames = 0
+    batch_size = max(1, args.batch_size)
+    batch = []
+    last_hash = None
+    last_detections = DetectionBatch.empty()
+    log_progress = logger.isEnabledFor(logging.INFO)
+    allowed_classes = set(args.classes)
 
     while True:
-        ret, frame = video.read()
-        if not ret:
-            logger.info("End of stream reached.")
-            break
+        ret, frame = reader.read()
+        if ret:
+            skip = False
+            if args.skip_gate > 0:
+                current_hash = frame_hash(frame)
+                skip = (last_hash is not None
+                        and bin(current_hash ^ last_hash).count("1") < args.skip_gate)
+                if not skip:
+                    last_hash = current_hash
+            batch.append((frame, skip))
         
-        detections = detector.detect(frame, set(args.classes))
-        total_detections += len(detections)
+        if batch and (len(batch) == batch_size or not ret):
+            inferred = iter(detector.detect_batch(
+                [out_frame for out_frame, skip in batch if not skip], allowed_classes
+            ))
+            
+            fps_meter.update(len(batch))
+            for out_frame, skip in batch:
+                if skip:
+                    skipped_frames += 1
+                else:
+                    last_detections = next(inferred)
+                detections = last_detections
+                total_detections += len(detections)
 
-        frame = renderer.draw_detections(frame, detections)
-        
-        fps_meter.update()
-        frame = renderer.draw_fps(frame, fps_meter.get_fps())
+                renderer.render(out_frame, detections, fps_meter.fps_str)
 
-        writer.write(frame)
+                writer.write(out_frame)
+                
+                frame_count += 1
+                if log_progress and frame_count % 30 == 0:
+                    logger.info("Processed %d/%d frames - Found %d objects",
+                                frame_count, expected_frames, len(detections))
+            batch = []
         
-        frame_count += 1
-        if frame_count % 30 == 0:
-            logger.info(f"Processed {frame_count}/{video.total_frames} frames - "
-                       f"Found {len(detections)} objects")
+        if not ret:
+            logger.info("End of stream reached.")
+            break
 
+    reader.stop()
     video.release()
     writer.release()
     
     logger.info("=" * 50)
     logger.info("Processing complete!")
     logger.info(f"Total frames processed: {frame_count}")
+    if args.skip_gate > 0:
+        logger.info(f"Frames reusing previous detections: {skipped_frames}")
     logger.info(f"Total detections: {total_detections}")
     logger.info(f"Output file saved: {args.output}")
     logger.info("=" * 50)